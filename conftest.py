@@ -1,37 +1,55 @@
 """
 Pytest configuration and fixtures for ML API tests.
 """
+import asyncio
+
 import pytest
-from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from app import main
 from app.main import app
-from app.model_loader import ModelLoader
+from app.model_loader import ModelLoader, get_loader
 
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_session():
     """Setup before all tests."""
-    # Reset model loader singleton for testing
-    ModelLoader._instance = None
     yield
     # Cleanup after all tests
-    ModelLoader._instance = None
+    get_loader.cache_clear()
 
 
-@pytest.fixture
-def client():
-    """Provide FastAPI test client."""
-    return TestClient(app)
+@pytest.fixture(scope="session")
+def event_loop():
+    """Share one event loop across the session so async fixtures can be session-scoped."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+async def client():
+    """Provide async HTTP client dispatching directly to the ASGI app."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture(scope="session")
 def model_loader():
     """Provide model loader instance with demo model."""
-    loader = ModelLoader()
+    loader = get_loader()
     if not loader.is_loaded():
         loader.create_demo_model()
     return loader
 
 
+@pytest.fixture
+def unloaded_model_loader(monkeypatch):
+    """Swap the app's model loader for a fresh, unloaded one for a single test."""
+    loader = ModelLoader()
+    monkeypatch.setattr(main, "model_loader", loader)
+    return loader
+
+
 @pytest.fixture
 def valid_features():
     """Provide valid input features for tests."""
@@ -2,20 +2,38 @@
 Production ML Inference API using FastAPI.
 Provides endpoints for model health checks and predictions with request logging.
 """
+import atexit
 import logging
 import logging.config
-from datetime import datetime
+import os
+import queue
+import time
+from logging.handlers import QueueListener
+from pathlib import Path
 from typing import Dict, Any
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
-from app.schemas import PredictionRequest, PredictionResponse, HealthCheckResponse, ErrorResponse
-from app.model_loader import ModelLoader
+from app.schemas import (
+    PredictionRequest,
+    PredictionResponse,
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    HealthCheckResponse,
+    ErrorResponse,
+)
+from app.model_loader import get_loader
+
+# Configure logging. Request handlers only enqueue records on LOG_QUEUE; the
+# stdout and rotating file handlers run on a QueueListener thread, so disk I/O
+# never blocks the event loop.
+LOG_QUEUE: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+LOG_FILE = Path("logs/api.log")
 
-# Configure logging
 LOGGING_CONFIG = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -35,25 +53,49 @@ LOGGING_CONFIG = {
         },
         "file": {
             "formatter": "detailed",
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": "logs/api.log",
+            # Multi-process safe rotation (shared log across uvicorn workers);
+            # rotated backups are gzipped
+            "class": "concurrent_log_handler.ConcurrentRotatingFileHandler",
+            "filename": str(LOG_FILE),
             "maxBytes": 10485760,  # 10MB
             "backupCount": 5,
+            "use_gzip": True,
+        },
+        "queue": {
+            "class": "logging.handlers.QueueHandler",
+            "queue": LOG_QUEUE,
         },
     },
     "loggers": {
         "": {
-            "handlers": ["default", "file"],
+            "handlers": ["queue"],
             "level": "INFO",
         },
+        # Holds the sink handlers drained by the QueueListener; never logged to directly
+        "log_sink": {
+            "handlers": ["default", "file"],
+            "propagate": False,
+        },
     },
 }
 
+LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
 logging.config.dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
 
+log_listener = QueueListener(
+    LOG_QUEUE,
+    *logging.getLogger("log_sink").handlers,
+    respect_handler_level=True,
+)
+# Started at import (not in lifespan) so records are drained even when lifespan
+# never runs, e.g. ASGITransport in tests, scripts, or `--lifespan off`; stopped
+# at interpreter exit, which flushes anything still queued.
+log_listener.start()
+atexit.register(log_listener.stop)
+
 # Initialize model loader (singleton)
-model_loader = ModelLoader()
+model_loader = get_loader()
 
 
 @asynccontextmanager
@@ -66,11 +108,10 @@ async def lifespan(app: FastAPI):
     logger.info("Starting ML Inference API")
     
     # Try to load model from environment variable, otherwise use demo model
-    import os
     model_path = os.getenv("MODEL_PATH", None)
     
     if model_path:
-        logger.info(f"Loading model from path: {model_path}")
+        logger.info("Loading model from path: %s", model_path)
         if not model_loader.load_sklearn_model(model_path):
             logger.warning("Failed to load model from specified path, using demo model")
             model_loader.create_demo_model()
@@ -78,6 +119,9 @@ async def lifespan(app: FastAPI):
         logger.info("No model path provided, using demo model")
         model_loader.create_demo_model()
     
+    if model_loader.warmup():
+        logger.info("Model warmed")
+    
     yield
     
     # Shutdown
@@ -90,51 +134,90 @@ app = FastAPI(
     description="Production-ready ML inference API with request logging and validation",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Add CORS middleware only when browser clients need it (ENABLE_CORS=1)
+if os.getenv("ENABLE_CORS") == "1":
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()],
+        allow_credentials=True,
+        allow_methods=["GET", "POST"],
+        allow_headers=["content-type", "x-request-id"],
+    )
+
+
+# Probe endpoints polled by load balancers/orchestrators; access-logged at DEBUG
+QUIET_PATHS = frozenset({"/health", "/"})
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
+class RequestLogMiddleware:
     """
-    Middleware to log all incoming requests and responses.
+    Pure ASGI middleware to log all incoming requests and responses.
     """
-    request_id = request.headers.get("X-Request-ID", "unknown")
-    start_time = datetime.utcnow()
-    
-    logger.info(
-        f"[{request_id}] {request.method} {request.url.path} - "
-        f"Client: {request.client.host if request.client else 'unknown'}"
-    )
-    
-    try:
-        response = await call_next(request)
-        process_time = (datetime.utcnow() - start_time).total_seconds()
-        
-        logger.info(
-            f"[{request_id}] Response: {response.status_code} - "
-            f"Duration: {process_time:.3f}s"
-        )
-        
-        response.headers["X-Process-Time"] = str(process_time)
-        response.headers["X-Request-ID"] = request_id
-        
-        return response
-    except Exception as e:
-        process_time = (datetime.utcnow() - start_time).total_seconds()
-        logger.error(
-            f"[{request_id}] Error processing request: {str(e)} - "
-            f"Duration: {process_time:.3f}s"
-        )
-        raise
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = b"unknown"
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                rid = value
+                break
+        start = time.perf_counter()
+        path = scope["path"]
+        level = logging.DEBUG if path in QUIET_PATHS else logging.INFO
+        log_access = logger.isEnabledFor(level)
+        # Request metadata is only decoded when an access line will be written
+        request_id = rid.decode("latin-1") if log_access else ""
+
+        if log_access:
+            client = scope.get("client")
+            logger.log(
+                level,
+                "[%s] %s %s - Client: %s",
+                request_id, scope["method"], path, client[0] if client else "unknown",
+            )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start
+
+                if log_access:
+                    logger.log(
+                        level,
+                        "[%s] Response: %s - Duration: %.3fs",
+                        request_id, message["status"], process_time,
+                    )
+
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", f"{process_time:.3f}".encode()))
+                headers.append((b"x-request-id", rid))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            process_time = time.perf_counter() - start
+            logger.error(
+                f"[{rid.decode('latin-1')}] Error processing request: {str(e)} - "
+                f"Duration: {process_time:.3f}s"
+            )
+            raise
+
+
+# Compress only responses large enough to benefit (e.g. big /predict_batch
+# payloads); a fast compression level keeps CPU cost low. Registered before
+# RequestLogMiddleware so the logged duration includes compression.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+app.add_middleware(RequestLogMiddleware)
 
 
 @app.get(
@@ -151,7 +234,7 @@ async def health_check() -> HealthCheckResponse:
     
     Returns model loading status and version information.
     """
-    logger.info("Health check requested")
+    logger.debug("Health check requested")
     
     return HealthCheckResponse(
         status="healthy" if model_loader.is_loaded() else "degraded",
@@ -162,12 +245,16 @@ async def health_check() -> HealthCheckResponse:
 
 @app.post(
     "/predict",
-    response_model=PredictionResponse,
+    response_model=None,
     status_code=status.HTTP_200_OK,
     tags=["Predictions"],
     summary="Make Prediction",
     description="Get prediction for input features",
     responses={
+        200: {
+            "model": PredictionResponse,
+            "description": "Successful prediction"
+        },
         400: {
             "model": ErrorResponse,
             "description": "Invalid input validation"
@@ -178,7 +265,7 @@ async def health_check() -> HealthCheckResponse:
         }
     }
 )
-async def predict(request: PredictionRequest) -> PredictionResponse:
+async def predict(request: PredictionRequest) -> ORJSONResponse:
     """
     Make a prediction using loaded model.
     
@@ -199,7 +286,7 @@ async def predict(request: PredictionRequest) -> PredictionResponse:
             detail="Model is not loaded. Please check health endpoint.",
         )
     
-    logger.info(f"Prediction requested with features: {request.features}")
+    logger.info("Prediction requested with features: %s", request.features)
     
     # Make prediction
     result = model_loader.predict(request.features)
@@ -211,19 +298,81 @@ async def predict(request: PredictionRequest) -> PredictionResponse:
             detail="Error during prediction. Check logs for details.",
         )
     
-    response = PredictionResponse(
-        prediction=result['prediction'],
-        probability=result['probability'],
-        model_version=result['model_version'],
-        input_features=request.features,
-    )
-    
     logger.info(
-        f"Prediction successful. Prediction: {response.prediction}, "
-        f"Probability: {response.probability}"
+        "Prediction successful. Prediction: %s, Probability: %s",
+        result['prediction'], result['probability'],
     )
     
-    return response
+    # Model output is already well-typed; skip response_model re-validation
+    return ORJSONResponse({
+        "prediction": result['prediction'],
+        "probability": result['probability'],
+        "model_version": result['model_version'],
+        "input_features": request.features,
+    })
+
+
+@app.post(
+    "/predict_batch",
+    response_model=None,
+    status_code=status.HTTP_200_OK,
+    tags=["Predictions"],
+    summary="Make Batch Prediction",
+    description="Get predictions for multiple inputs with a single model call",
+    responses={
+        200: {
+            "model": BatchPredictionResponse,
+            "description": "Successful batch prediction"
+        },
+        400: {
+            "model": ErrorResponse,
+            "description": "Invalid input validation"
+        },
+        503: {
+            "model": ErrorResponse,
+            "description": "Model not loaded"
+        }
+    }
+)
+async def predict_batch(request: BatchPredictionRequest) -> ORJSONResponse:
+    """
+    Make predictions for a batch of inputs using loaded model.
+    
+    Args:
+        request: BatchPredictionRequest with feature lists and optional model version
+        
+    Returns:
+        BatchPredictionResponse with one prediction per input instance
+        
+    Raises:
+        HTTPException: If validation fails or model is not loaded
+    """
+    if not model_loader.is_loaded():
+        logger.error("Batch prediction requested but model is not loaded")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model is not loaded. Please check health endpoint.",
+        )
+    
+    logger.info("Batch prediction requested for %d instances", len(request.instances))
+    
+    results = model_loader.predict_batch(request.instances)
+    
+    if results is None:
+        logger.error("Batch prediction failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error during prediction. Check logs for details.",
+        )
+    
+    logger.info("Batch prediction successful for %d instances", len(results))
+    
+    return ORJSONResponse({
+        "predictions": [
+            {**result, "input_features": features}
+            for result, features in zip(results, request.instances)
+        ]
+    })
 
 
 @app.get(
@@ -242,6 +391,7 @@ async def root() -> Dict[str, Any]:
         "endpoints": {
             "health": "/health",
             "predict": "/predict",
+            "predict_batch": "/predict_batch",
             "docs": "/docs",
             "openapi": "/openapi.json",
         },
@@ -253,7 +403,7 @@ async def root() -> Dict[str, Any]:
 async def value_error_handler(request: Request, exc: ValueError):
     """Handle ValueError exceptions."""
     logger.error(f"Validation error: {str(exc)}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={
             "detail": str(exc),
@@ -266,7 +416,7 @@ async def value_error_handler(request: Request, exc: ValueError):
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle general exceptions."""
     logger.error(f"Unexpected error: {str(exc)}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "detail": "Internal server error. Check logs for details.",
@@ -1,35 +1,97 @@
 """
 Model loader module for handling ML model loading and caching.
-Supports both scikit-learn and PyTorch models.
+Supports both scikit-learn and PyTorch models, with optional ONNX Runtime
+acceleration for the demo model.
 """
 import logging
-import pickle
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Any
+from typing import Optional, Any, Callable, List, Tuple, cast
+import joblib
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Number of distinct feature vectors whose predictions are memoized
+PREDICTION_CACHE_SIZE = 1024
+
 
 class ModelLoader:
     """Load and cache ML models for inference."""
     
-    _instance: Optional['ModelLoader'] = None
-    _model: Optional[Any] = None
-    _model_version: str = "v1.0.0"
+    def __init__(self):
+        self._model: Optional[Any] = None
+        self._model_version: str = "v1.0.0"
+        # Input dtype expected by the active backend (float32 for ONNX Runtime)
+        self._input_dtype: np.dtype = np.dtype(np.float64)
+        # Reusable single-sample input buffer (reallocated if shape or dtype differs)
+        self._scratch: np.ndarray = np.empty((1, 4), dtype=self._input_dtype)
+        # Bound model methods resolved once per load instead of per prediction
+        self._predict: Optional[Callable] = None
+        self._predict_proba: Optional[Callable] = None
+        # Compiled ONNX Runtime session used instead of sklearn when available
+        self._ort_session: Optional[Any] = None
+        # Memoized predictions keyed by feature tuple; cleared on model change
+        self._cache = lru_cache(maxsize=PREDICTION_CACHE_SIZE)(self._predict_uncached)
     
-    def __new__(cls):
-        """Implement singleton pattern."""
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    def _bind_model_methods(self) -> None:
+        """Cache the loaded model's bound methods and drop stale predictions and sessions."""
+        self._predict = getattr(self._model, 'predict', None)
+        self._predict_proba = getattr(self._model, 'predict_proba', None)
+        self._ort_session = None
+        self._input_dtype = np.dtype(np.float64)
+        self._cache.cache_clear()
+    
+    def _build_onnx_session(self, model: Any, n_features: int) -> Optional[Any]:
+        """
+        Compile a fitted sklearn classifier to an ONNX Runtime session.
+        
+        Args:
+            model: Fitted sklearn classifier
+            n_features: Number of input features
+            
+        Returns:
+            InferenceSession, or None if skl2onnx/onnxruntime are unavailable or conversion fails
+        """
+        try:
+            import onnxruntime as ort
+            from skl2onnx import convert_sklearn
+            from skl2onnx.common.data_types import FloatTensorType
+        except ImportError:
+            logger.info("skl2onnx/onnxruntime not installed, using sklearn for inference")
+            return None
+        
+        try:
+            onx = convert_sklearn(
+                model,
+                initial_types=[('input', FloatTensorType([None, n_features]))],
+                options={id(model): {'zipmap': False}},
+            )
+            
+            # Single-sample requests are latency bound; extra threads only add overhead
+            sess_options = ort.SessionOptions()
+            sess_options.intra_op_num_threads = 1
+            
+            return ort.InferenceSession(
+                onx.SerializeToString(),
+                sess_options,
+                providers=['CPUExecutionProvider'],
+            )
+        except Exception as e:
+            logger.warning(f"ONNX conversion failed, using sklearn for inference: {str(e)}")
+            return None
     
     def load_sklearn_model(self, model_path: str) -> bool:
         """
-        Load a scikit-learn model from pickle file.
+        Load a scikit-learn model from a joblib or pickle file.
+        
+        Numpy arrays inside the model are memory-mapped read-only, so workers
+        share pages instead of each holding a copy. Save models with
+        ``joblib.dump(model, path, protocol=5, compress=False)`` to get this;
+        compressed dumps and plain pickles are loaded fully into memory.
         
         Args:
-            model_path: Path to the pickle file
+            model_path: Path to the model file
             
         Returns:
             True if loading successful, False otherwise
@@ -37,13 +99,13 @@ class ModelLoader:
         try:
             model_path = Path(model_path)
             if not model_path.exists():
-                logger.error(f"Model file not found: {model_path}")
+                logger.error("Model file not found: %s", model_path)
                 return False
             
-            with open(model_path, 'rb') as f:
-                self._model = pickle.load(f)
+            self._model = joblib.load(model_path, mmap_mode="r")
+            self._bind_model_methods()
             
-            logger.info(f"Successfully loaded sklearn model from {model_path}")
+            logger.info("Successfully loaded sklearn model from %s", model_path)
             return True
         except Exception as e:
             logger.error(f"Failed to load sklearn model: {str(e)}")
@@ -65,7 +127,7 @@ class ModelLoader:
             
             model_path = Path(model_path)
             if not model_path.exists():
-                logger.error(f"Model file not found: {model_path}")
+                logger.error("Model file not found: %s", model_path)
                 return False
             
             device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -73,8 +135,9 @@ class ModelLoader:
             self._model.load_state_dict(torch.load(model_path, map_location=device))
             self._model.to(device)
             self._model.eval()
+            self._bind_model_methods()
             
-            logger.info(f"Successfully loaded PyTorch model from {model_path}")
+            logger.info("Successfully loaded PyTorch model from %s", model_path)
             return True
         except Exception as e:
             logger.error(f"Failed to load PyTorch model: {str(e)}")
@@ -105,6 +168,12 @@ class ModelLoader:
             
             self._model = model
             self._model_version = "demo"
+            self._bind_model_methods()
+            
+            self._ort_session = self._build_onnx_session(model, X.shape[1])
+            if self._ort_session is not None:
+                self._input_dtype = np.dtype(np.float32)
+                logger.info("Compiled demo model to ONNX Runtime")
             
             logger.info("Created demo sklearn RandomForest model")
             return True
@@ -122,37 +191,122 @@ class ModelLoader:
         Returns:
             Dictionary with prediction and metadata, or None if error
         """
+        if self._model is None:
+            logger.error("No model loaded")
+            return None
+        
+        # Failures raise out of the cached call, so they are never memoized
+        try:
+            return cast(dict, self._cache(tuple(features)))
+        except Exception as e:
+            logger.error(f"Prediction failed: {str(e)}")
+            return None
+    
+    def _predict_uncached(self, features: Tuple[float, ...]) -> dict:
+        """Run the model on a single feature vector (backs the prediction cache). Raises on failure."""
+        # Copy into the preallocated input buffer
+        if self._scratch.shape[1] != len(features) or self._scratch.dtype != self._input_dtype:
+            self._scratch = np.empty((1, len(features)), dtype=self._input_dtype)
+        X = self._scratch
+        X[0] = features
+        
+        if self._ort_session is not None:
+            labels, proba = self._ort_session.run(None, {'input': X})
+            prediction = labels[0]
+            # Round away float32 noise (e.g. 0.70000005) so results match sklearn
+            probability = round(float(np.max(proba[0])), 6)
+        # Check if it's a sklearn model
+        elif self._predict is not None:
+            prediction = self._predict(X)[0]
+            
+            # Try to get probability if available
+            probability = None
+            if self._predict_proba is not None:
+                proba = self._predict_proba(X)[0]
+                probability = float(np.max(proba))
+        else:
+            raise TypeError("Model does not have predict method")
+        
+        return {
+            'prediction': float(prediction),
+            'probability': probability,
+            'model_version': self._model_version
+        }
+    
+    def predict_batch(self, batch: List[List[float]]) -> Optional[List[dict]]:
+        """
+        Make predictions for a batch of inputs with a single model call.
+        
+        Args:
+            batch: List of feature lists, one per sample
+            
+        Returns:
+            List of dictionaries with prediction and metadata, or None if error
+        """
         try:
             if self._model is None:
                 logger.error("No model loaded")
                 return None
             
-            # Convert to numpy array
-            X = np.array([features])
+            X = np.asarray(batch, dtype=self._input_dtype)
             
-            # Check if it's a sklearn model
-            if hasattr(self._model, 'predict'):
-                prediction = self._model.predict(X)[0]
-                
-                # Try to get probability if available
-                probability = None
-                if hasattr(self._model, 'predict_proba'):
-                    proba = self._model.predict_proba(X)[0]
-                    probability = float(np.max(proba))
+            if self._ort_session is not None:
+                predictions, proba = self._ort_session.run(None, {'input': X})
+                probabilities: List[Optional[float]] = [round(float(p), 6) for p in np.max(proba, axis=1)]
+            elif self._predict is not None:
+                predictions = self._predict(X)
                 
-                return {
+                probabilities = [None] * len(predictions)
+                if self._predict_proba is not None:
+                    probabilities = np.max(self._predict_proba(X), axis=1).tolist()
+            else:
+                logger.error("Model does not have predict method")
+                return None
+            
+            return [
+                {
                     'prediction': float(prediction),
                     'probability': probability,
                     'model_version': self._model_version
                 }
-            else:
-                logger.error("Model does not have predict method")
-                return None
+                for prediction, probability in zip(predictions, probabilities)
+            ]
                 
         except Exception as e:
-            logger.error(f"Prediction failed: {str(e)}")
+            logger.error(f"Batch prediction failed: {str(e)}")
             return None
     
+    def warmup(self) -> bool:
+        """
+        Run one throwaway inference so the first real request avoids cold-path costs.
+        
+        Bypasses the prediction cache. PyTorch models get a single zeros-input
+        forward pass under inference mode.
+        
+        Returns:
+            True if warmup succeeded, False otherwise
+        """
+        try:
+            if self._model is None:
+                logger.error("No model loaded")
+                return False
+            
+            n_features = getattr(self._model, 'n_features_in_', self._scratch.shape[1])
+            
+            if self._predict is not None:
+                self._predict_uncached((0.0,) * n_features)
+                return True
+            
+            import torch
+            
+            device = next(self._model.parameters()).device
+            with torch.inference_mode():
+                self._model(torch.zeros((1, n_features), device=device))
+            return True
+        except Exception as e:
+            logger.error(f"Model warmup failed: {str(e)}")
+            return False
+    
     def is_loaded(self) -> bool:
         """Check if model is loaded."""
         return self._model is not None
@@ -164,4 +318,11 @@ class ModelLoader:
     def set_model_version(self, version: str) -> None:
         """Set model version string."""
         self._model_version = version
-        logger.info(f"Model version set to {version}")
+        self._cache.cache_clear()
+        logger.info("Model version set to %s", version)
+
+
+@lru_cache(maxsize=1)
+def get_loader() -> ModelLoader:
+    """Return the process-wide ModelLoader instance."""
+    return ModelLoader()
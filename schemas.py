@@ -1,31 +1,31 @@
 """
 Pydantic schemas for request/response validation.
 """
-from typing import List, Optional
-from pydantic import BaseModel, Field, validator
+from typing import Annotated, List, Optional
+from pydantic import BaseModel, Field
+
+# Upper bound on /predict_batch instances; the batch is scored on the event loop
+MAX_BATCH_SIZE = 1000
+
+# Exactly 4 numerical features; length is enforced by pydantic-core
+FeatureVector = Annotated[List[float], Field(min_length=4, max_length=4)]
 
 
 class PredictionRequest(BaseModel):
     """Schema for prediction request."""
     
-    features: List[float] = Field(
-        ..., 
-        description="List of numerical features for prediction",
+    features: Annotated[List[float], Field(
+        ...,
+        min_length=4,
+        max_length=4,
+        description="List of exactly 4 numerical features for prediction",
         examples=[[1.0, 2.0, 3.0, 4.0]]
-    )
+    )]
     model_version: Optional[str] = Field(
         default="latest",
         description="Model version to use for prediction"
     )
     
-    @validator('features')
-    def validate_features(cls, v):
-        if not v:
-            raise ValueError("Features list cannot be empty")
-        if len(v) != 4:
-            raise ValueError("Expected exactly 4 features")
-        return v
-    
     class Config:
         json_schema_extra = {
             "example": {
@@ -57,6 +57,50 @@ class PredictionResponse(BaseModel):
         }
 
 
+class BatchPredictionRequest(BaseModel):
+    """Schema for batch prediction request."""
+    
+    instances: Annotated[List[FeatureVector], Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description=f"List of feature lists (exactly 4 features each), one per sample; at most {MAX_BATCH_SIZE}",
+        examples=[[[5.1, 3.5, 1.4, 0.2], [6.2, 2.9, 4.3, 1.3]]]
+    )]
+    model_version: Optional[str] = Field(
+        default="latest",
+        description="Model version to use for prediction"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "instances": [[5.1, 3.5, 1.4, 0.2], [6.2, 2.9, 4.3, 1.3]],
+                "model_version": "latest"
+            }
+        }
+
+
+class BatchPredictionResponse(BaseModel):
+    """Schema for batch prediction response."""
+    
+    predictions: List[PredictionResponse] = Field(..., description="One prediction per input instance")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "predictions": [
+                    {
+                        "prediction": 0.0,
+                        "probability": 0.95,
+                        "model_version": "v1.0.0",
+                        "input_features": [5.1, 3.5, 1.4, 0.2]
+                    }
+                ]
+            }
+        }
+
+
 class HealthCheckResponse(BaseModel):
     """Schema for health check response."""
     
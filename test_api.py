@@ -1,39 +1,51 @@
 """
 Unit and integration tests for ML Inference API.
 """
+import logging
+
+import numpy as np
 import pytest
 from fastapi import status
+from pydantic import ValidationError
 from app.schemas import PredictionRequest
 
 
 class TestHealthCheck:
     """Tests for health check endpoint."""
     
-    def test_health_check_success(self, client):
+    async def test_health_check_success(self, client):
         """Test successful health check."""
-        response = client.get("/health")
+        response = await client.get("/health")
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert "status" in data
         assert "model_loaded" in data
         assert data["status"] in ["healthy", "degraded"]
     
-    def test_health_check_model_loaded(self, client, model_loader):
+    async def test_health_check_model_loaded(self, client, model_loader):
         """Test health check when model is loaded."""
         assert model_loader.is_loaded()
-        response = client.get("/health")
+        response = await client.get("/health")
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert data["model_loaded"] is True
         assert data["status"] == "healthy"
 
+    async def test_health_check_not_access_logged_at_info(self, client, caplog):
+        """Test that health probes are kept out of the INFO access log."""
+        with caplog.at_level(logging.INFO, logger="app.main"):
+            response = await client.get("/health")
+        assert response.status_code == status.HTTP_200_OK
+        access_logs = [r.getMessage() for r in caplog.records if r.name == "app.main"]
+        assert not any("/health" in message for message in access_logs)
+
 
 class TestRootEndpoint:
     """Tests for root endpoint."""
     
-    def test_root_endpoint(self, client):
+    async def test_root_endpoint(self, client):
         """Test root endpoint returns API info."""
-        response = client.get("/")
+        response = await client.get("/")
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert "name" in data
@@ -46,7 +58,7 @@ class TestRootEndpoint:
 class TestPredictEndpoint:
     """Tests for prediction endpoint."""
     
-    def test_predict_valid_input(self, client, model_loader, valid_features):
+    async def test_predict_valid_input(self, client, model_loader, valid_features):
         """Test prediction with valid input."""
         assert model_loader.is_loaded()
         
@@ -55,7 +67,7 @@ class TestPredictEndpoint:
             "model_version": "latest"
         }
         
-        response = client.post("/predict", json=payload)
+        response = await client.post("/predict", json=payload)
         assert response.status_code == status.HTTP_200_OK
         
         data = response.json()
@@ -65,7 +77,7 @@ class TestPredictEndpoint:
         assert data["input_features"] == valid_features
         assert isinstance(data["prediction"], (int, float))
     
-    def test_predict_invalid_features_count(self, client, model_loader, invalid_features):
+    async def test_predict_invalid_features_count(self, client, model_loader, invalid_features):
         """Test prediction with invalid number of features."""
         assert model_loader.is_loaded()
         
@@ -74,10 +86,10 @@ class TestPredictEndpoint:
             "model_version": "latest"
         }
         
-        response = client.post("/predict", json=payload)
+        response = await client.post("/predict", json=payload)
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     
-    def test_predict_empty_features(self, client, model_loader):
+    async def test_predict_empty_features(self, client, model_loader):
         """Test prediction with empty features list."""
         assert model_loader.is_loaded()
         
@@ -86,10 +98,10 @@ class TestPredictEndpoint:
             "model_version": "latest"
         }
         
-        response = client.post("/predict", json=payload)
+        response = await client.post("/predict", json=payload)
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     
-    def test_predict_missing_features(self, client, model_loader):
+    async def test_predict_missing_features(self, client, model_loader):
         """Test prediction with missing features field."""
         assert model_loader.is_loaded()
         
@@ -97,10 +109,10 @@ class TestPredictEndpoint:
             "model_version": "latest"
         }
         
-        response = client.post("/predict", json=payload)
+        response = await client.post("/predict", json=payload)
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     
-    def test_predict_response_headers(self, client, model_loader, valid_features):
+    async def test_predict_response_headers(self, client, model_loader, valid_features):
         """Test that response includes custom headers."""
         assert model_loader.is_loaded()
         
@@ -109,10 +121,85 @@ class TestPredictEndpoint:
             "model_version": "latest"
         }
         
-        response = client.post("/predict", json=payload)
+        response = await client.post("/predict", json=payload)
         assert response.status_code == status.HTTP_200_OK
         assert "X-Process-Time" in response.headers
         assert "X-Request-ID" in response.headers
+    
+    async def test_predict_echoes_request_id(self, client, model_loader, valid_features):
+        """Test that a client-supplied X-Request-ID is echoed back."""
+        response = await client.post(
+            "/predict",
+            json={"features": valid_features},
+            headers={"X-Request-ID": "req-123"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["X-Request-ID"] == "req-123"
+
+
+class TestPredictBatchEndpoint:
+    """Tests for batch prediction endpoint."""
+    
+    async def test_predict_batch_valid_input(self, client, model_loader, valid_features):
+        """Test batch prediction with valid input."""
+        assert model_loader.is_loaded()
+        
+        payload = {
+            "instances": [valid_features, valid_features],
+            "model_version": "latest"
+        }
+        
+        response = await client.post("/predict_batch", json=payload)
+        assert response.status_code == status.HTTP_200_OK
+        
+        data = response.json()
+        assert len(data["predictions"]) == 2
+        assert data["predictions"][0]["input_features"] == valid_features
+    
+    async def test_predict_batch_large_response_compressed(self, client, model_loader, valid_features):
+        """Test that large batch responses are gzip-compressed."""
+        payload = {
+            "instances": [valid_features] * 50
+        }
+        
+        response = await client.post("/predict_batch", json=payload, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "X-Process-Time" in response.headers
+        assert len(response.json()["predictions"]) == 50
+    
+    async def test_predict_batch_invalid_features_count(self, client, model_loader, valid_features, invalid_features):
+        """Test batch prediction with one instance of the wrong length."""
+        assert model_loader.is_loaded()
+        
+        payload = {
+            "instances": [valid_features, invalid_features]
+        }
+        
+        response = await client.post("/predict_batch", json=payload)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    async def test_predict_batch_too_many_instances(self, client, model_loader, valid_features):
+        """Test batch prediction rejects batches over the size cap."""
+        from app.schemas import MAX_BATCH_SIZE
+        
+        payload = {
+            "instances": [valid_features] * (MAX_BATCH_SIZE + 1)
+        }
+        
+        response = await client.post("/predict_batch", json=payload)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    async def test_predict_batch_empty_instances(self, client, model_loader):
+        """Test batch prediction with empty instances list."""
+        assert model_loader.is_loaded()
+        
+        payload = {
+            "instances": []
+        }
+        
+        response = await client.post("/predict_batch", json=payload)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
 class TestPredictionRequest:
@@ -134,12 +221,12 @@ class TestPredictionRequest:
     
     def test_invalid_prediction_request_features_count(self, invalid_features):
         """Test invalid prediction request with wrong feature count."""
-        with pytest.raises(ValueError):
+        with pytest.raises(ValidationError):
             PredictionRequest(features=invalid_features)
     
     def test_invalid_prediction_request_empty(self):
         """Test invalid prediction request with empty features."""
-        with pytest.raises(ValueError):
+        with pytest.raises(ValidationError):
             PredictionRequest(features=[])
 
 
@@ -147,22 +234,54 @@ class TestModelLoader:
     """Tests for model loader functionality."""
     
     def test_model_loader_singleton(self):
-        """Test that ModelLoader is a singleton."""
-        from app.model_loader import ModelLoader
-        loader1 = ModelLoader()
-        loader2 = ModelLoader()
+        """Test that get_loader returns a shared ModelLoader."""
+        from app.model_loader import get_loader
+        loader1 = get_loader()
+        loader2 = get_loader()
         assert loader1 is loader2
     
     def test_demo_model_creation(self):
         """Test creating a demo model."""
         from app.model_loader import ModelLoader
-        ModelLoader._instance = None  # Reset singleton
         
         loader = ModelLoader()
         assert loader.create_demo_model()
         assert loader.is_loaded()
         assert loader.get_model_version() == "demo"
     
+    def test_sklearn_model_loading(self, model_loader, valid_features, tmp_path):
+        """Test loading a joblib-saved sklearn model with memory mapping."""
+        import joblib
+        from app.model_loader import ModelLoader
+        
+        model_path = tmp_path / "model.pkl"
+        joblib.dump(model_loader._model, model_path, protocol=5, compress=False)
+        
+        loader = ModelLoader()
+        assert loader.load_sklearn_model(str(model_path))
+        assert loader.predict(valid_features)["prediction"] == model_loader.predict(valid_features)["prediction"]
+        assert not loader.load_sklearn_model(str(tmp_path / "missing.pkl"))
+    
+    def test_demo_model_onnx_matches_sklearn(self):
+        """Test the ONNX-compiled demo model agrees with sklearn."""
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("skl2onnx")
+        from sklearn.datasets import load_iris
+        from app.model_loader import ModelLoader
+        
+        loader = ModelLoader()
+        assert loader.create_demo_model()
+        assert loader._ort_session is not None
+        
+        X = load_iris().data
+        results = loader.predict_batch(X.tolist())
+        assert [r["prediction"] for r in results] == loader._model.predict(X).astype(float).tolist()
+        
+        expected_proba = [round(float(p), 6) for p in np.max(loader._model.predict_proba(X), axis=1)]
+        assert [r["probability"] for r in results] == expected_proba
+        single = loader.predict([6.0, 2.7, 5.1, 1.6])
+        assert single["probability"] == round(float(np.max(loader._model.predict_proba([[6.0, 2.7, 5.1, 1.6]]))), 6)
+    
     def test_model_prediction(self, model_loader, valid_features):
         """Test model prediction functionality."""
         result = model_loader.predict(valid_features)
@@ -171,39 +290,85 @@ class TestModelLoader:
         assert "probability" in result
         assert "model_version" in result
     
-    def test_model_not_loaded_prediction(self):
-        """Test prediction when model is not loaded."""
+    def test_model_batch_prediction(self, model_loader, valid_features):
+        """Test batch prediction matches single-sample prediction."""
+        single = model_loader.predict(valid_features)
+        results = model_loader.predict_batch([valid_features, valid_features])
+        assert results is not None
+        assert len(results) == 2
+        assert results[0] == single
+    
+    def test_model_prediction_cache(self, valid_features):
+        """Test repeated predictions are memoized and reset on version change."""
+        from app.model_loader import ModelLoader
+        
+        loader = ModelLoader()
+        assert loader.create_demo_model()
+        first = loader.predict(valid_features)
+        assert loader.predict(valid_features) is first
+        
+        loader.set_model_version("v3.0.0")
+        assert loader.predict(valid_features)["model_version"] == "v3.0.0"
+    
+    def test_model_prediction_failure_not_cached(self, valid_features):
+        """Test a failed prediction is retried rather than served from the cache."""
         from app.model_loader import ModelLoader
-        ModelLoader._instance = None  # Reset singleton
+        
+        class FlakyModel:
+            calls = 0
+            
+            def predict(self, X):
+                self.calls += 1
+                if self.calls == 1:
+                    raise RuntimeError("transient failure")
+                return [1.0]
         
         loader = ModelLoader()
-        result = loader.predict([1.0, 2.0, 3.0, 4.0])
+        loader._model = FlakyModel()
+        loader._bind_model_methods()
+        
+        assert loader.predict(valid_features) is None
+        assert loader.predict(valid_features)["prediction"] == 1.0
+    
+    def test_model_warmup(self, model_loader):
+        """Test warmup runs an inference without populating the prediction cache."""
+        from app.model_loader import ModelLoader
+        
+        cached = model_loader._cache.cache_info().currsize
+        assert model_loader.warmup()
+        assert model_loader._cache.cache_info().currsize == cached
+        assert not ModelLoader().warmup()
+    
+    @pytest.mark.parametrize("method, payload", [
+        ("predict", [1.0, 2.0, 3.0, 4.0]),
+        ("predict_batch", [[1.0, 2.0, 3.0, 4.0]]),
+    ])
+    def test_model_not_loaded_prediction(self, unloaded_model_loader, method, payload):
+        """Test prediction when model is not loaded."""
+        result = getattr(unloaded_model_loader, method)(payload)
         assert result is None
     
-    def test_model_version_setter(self, model_loader):
+    def test_model_version_setter(self, unloaded_model_loader):
         """Test setting model version."""
-        model_loader.set_model_version("v2.0.0")
-        assert model_loader.get_model_version() == "v2.0.0"
+        unloaded_model_loader.set_model_version("v2.0.0")
+        assert unloaded_model_loader.get_model_version() == "v2.0.0"
 
 
 class TestErrorHandling:
     """Tests for error handling."""
     
-    def test_non_existent_endpoint(self, client):
+    async def test_non_existent_endpoint(self, client):
         """Test 404 for non-existent endpoint."""
-        response = client.get("/nonexistent")
+        response = await client.get("/nonexistent")
         assert response.status_code == status.HTTP_404_NOT_FOUND
     
-    def test_predict_without_model(self, client):
+    async def test_predict_without_model(self, client, unloaded_model_loader):
         """Test prediction when model is not loaded."""
-        from app.model_loader import ModelLoader
-        ModelLoader._instance = None  # Reset singleton to unloaded state
-        
         payload = {
             "features": [5.1, 3.5, 1.4, 0.2]
         }
         
-        response = client.post("/predict", json=payload)
+        response = await client.post("/predict", json=payload)
         # Should return 503 since model is not loaded
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
 
@@ -211,7 +376,7 @@ class TestErrorHandling:
 class TestRequestValidation:
     """Tests for request validation."""
     
-    def test_non_numeric_features(self, client, model_loader):
+    async def test_non_numeric_features(self, client, model_loader):
         """Test prediction with non-numeric features."""
         assert model_loader.is_loaded()
         
@@ -219,5 +384,5 @@ class TestRequestValidation:
             "features": ["a", "b", "c", "d"]
         }
         
-        response = client.post("/predict", json=payload)
+        response = await client.post("/predict", json=payload)
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY